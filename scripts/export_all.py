@@ -1,65 +1,63 @@
 """
 Export all records to Excel
 
-Usage: python scripts/export_all.py <database.db>
+Usage: python scripts/export_all.py <database.db> [--format xlsx|parquet]
 
-Exports all records from the database to Excel.
+Exports all records from the database to Excel (default) or Parquet.
+Parquet output requires pyarrow.
 """
 
+import argparse
 import sys
 import os
 import sqlite3
-import pandas as pd
 
 # Add parent directory for imports
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
 from config import OUTPUT_DIR, ensure_output_dir
+from export import write_parquet, write_xlsx
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python export_all.py <database.db>")
-        sys.exit(1)
-
-    db_path = sys.argv[1]
+def main(db_path, fmt="xlsx"):
+    """Export from db_path as xlsx or parquet. Returns process exit code (0 on success)."""
     if not os.path.exists(db_path):
         print(f"[!] Database not found: {db_path}")
-        sys.exit(1)
+        return 1
 
     # Derive output filename from database name
     db_name = os.path.splitext(os.path.basename(db_path))[0]
     ensure_output_dir()
-    output_file = os.path.join(OUTPUT_DIR, f"{db_name}_all.xlsx")
+    output_file = os.path.join(OUTPUT_DIR, f"{db_name}_all.{fmt}")
 
     print(f"[*] Reading from {db_path}...")
 
     conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("""
+    cursor = conn.execute("""
         SELECT name, type, address, phone, email, website, source_url
         FROM businesses
         ORDER BY name
-    """, conn)
-    conn.close()
-
-    print(f"[*] Loaded {len(df)} records")
-
-    # Export
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='All Records')
-
-        worksheet = writer.sheets['All Records']
-        for idx, col in enumerate(df.columns):
-            max_length = max(
-                df[col].astype(str).map(len).max(),
-                len(col)
-            ) + 2
-            max_length = min(max_length, 50)
-            worksheet.column_dimensions[chr(65 + idx)].width = max_length
+    """)
+    try:
+        if fmt == "parquet":
+            count = write_parquet(cursor, output_file)
+        else:
+            count = write_xlsx(cursor, output_file, 'All Records')
+    except ImportError as e:
+        print(f"[!] Parquet export needs pyarrow (pip install pyarrow): {e}")
+        return 1
+    finally:
+        conn.close()
 
     print(f"\n[SUCCESS] Exported to {output_file}")
-    print(f"  Records: {len(df)}")
+    print(f"  Records: {count}")
     print(f"  Size: {os.path.getsize(output_file) / 1024:.1f} KB")
 
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Export all records to Excel or Parquet")
+    parser.add_argument("database", help="Path to database.db")
+    parser.add_argument("--format", choices=["xlsx", "parquet"], default="xlsx", help="Output format (default: xlsx)")
+    args = parser.parse_args()
+    sys.exit(main(args.database, args.format))
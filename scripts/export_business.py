@@ -11,45 +11,19 @@ Filters records classified as businesses based on:
 
 import sys
 import os
-import re
 import sqlite3
-import pandas as pd
 
 # Add parent directory for imports
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
-from config import BUSINESS_SUFFIXES, OUTPUT_DIR, ensure_output_dir
+from config import OUTPUT_DIR, ensure_output_dir
+from export import IS_BUSINESS_SQL, register_functions, write_xlsx
 
 
-def has_business_suffix(name):
-    """Check if name contains business suffix."""
-    if not name:
-        return False
-    for pattern in BUSINESS_SUFFIXES:
-        if re.search(pattern, name, re.IGNORECASE):
-            return True
-    return False
-
-
-def classify_business(row):
-    """Classify record as business or not."""
-    if row['type'] and str(row['type']).strip():
-        return True
-    if row['website'] and str(row['website']).strip():
-        return True
-    if has_business_suffix(row['name']):
-        return True
-    return False
-
-
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python export_business.py <database.db>")
-        sys.exit(1)
-
-    db_path = sys.argv[1]
+def main(db_path):
+    """Export from db_path. Returns process exit code (0 on success)."""
     if not os.path.exists(db_path):
         print(f"[!] Database not found: {db_path}")
-        sys.exit(1)
+        return 1
 
     # Derive output filename from database name
     db_name = os.path.splitext(os.path.basename(db_path))[0]
@@ -58,40 +32,29 @@ def main():
 
     print(f"[*] Reading from {db_path}...")
 
+    # Classify in SQL so only business rows are read, then stream them out
     conn = sqlite3.connect(db_path)
-    df = pd.read_sql_query("""
+    register_functions(conn)
+    cursor = conn.execute(f"""
         SELECT name, type, address, phone, email, website, source_url
         FROM businesses
+        WHERE {IS_BUSINESS_SQL}
         ORDER BY name
-    """, conn)
+    """)
+    count = write_xlsx(cursor, output_file, 'Businesses')
     conn.close()
 
-    print(f"[*] Loaded {len(df)} records")
-
-    # Classify
-    df['is_business'] = df.apply(classify_business, axis=1)
-    df_business = df[df['is_business'] == True].copy()
-    df_business = df_business.drop(columns=['is_business'])
-
-    print(f"[*] Classified {len(df_business)} as businesses")
-
-    # Export
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        df_business.to_excel(writer, index=False, sheet_name='Businesses')
-
-        worksheet = writer.sheets['Businesses']
-        for idx, col in enumerate(df_business.columns):
-            max_length = max(
-                df_business[col].astype(str).map(len).max(),
-                len(col)
-            ) + 2
-            max_length = min(max_length, 50)
-            worksheet.column_dimensions[chr(65 + idx)].width = max_length
+    print(f"[*] Classified {count} as businesses")
 
     print(f"\n[SUCCESS] Exported to {output_file}")
-    print(f"  Records: {len(df_business)}")
+    print(f"  Records: {count}")
     print(f"  Size: {os.path.getsize(output_file) / 1024:.1f} KB")
 
+    return 0
+
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) < 2:
+        print("Usage: python export_business.py <database.db>")
+        sys.exit(1)
+    sys.exit(main(sys.argv[1]))
@@ -3,6 +3,7 @@ Configuration constants for local.ch scraper
 """
 
 import os
+import re
 
 # Base directory (project root)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -21,6 +22,13 @@ HEADLESS = True
 PAGE_LOAD_TIMEOUT = 30
 ELEMENT_WAIT_TIMEOUT = 10
 
+# Page renderer for business pages: "browser" (Selenium) or "http" (httpx)
+DEFAULT_RENDERER = "browser"
+HTTP_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:128.0) Gecko/20100101 Firefox/128.0"
+DEFAULT_HTTP_CONCURRENCY = 10  # Requests in flight per "http" worker
+HTTP_KEEPALIVE_EXPIRY = 60  # Seconds an idle proxy connection is kept open
+PROBE_TIMEOUT = 5  # Seconds for the HEAD probe before a browser page load
+
 # Default scraping parameters (can be overridden via CLI)
 DEFAULT_PAGES = 150
 DEFAULT_WORKERS = 1  # Safe default, user can increase (1-20)
@@ -28,6 +36,8 @@ DEFAULT_WORKERS_NO_PROXY = 1
 DEFAULT_MAX_ERRORS = 3
 DEFAULT_DELAY = 0.3
 DEFAULT_PROXY_COOLDOWN = 300  # 5 minutes
+DEFAULT_DB_BATCH = 25  # Businesses buffered per worker before saving
+PROXY_WAIT_TIMEOUT = 300  # Max seconds a worker waits for a cold proxy
 
 # Business name suffixes for classification
 BUSINESS_SUFFIXES = [
@@ -43,6 +53,14 @@ BUSINESS_SUFFIXES = [
     r'\bSNC\b',
 ]
 
+# All suffixes as one compiled alternation, so a name is scanned once
+BUSINESS_SUFFIX_RE = re.compile('|'.join(f'(?:{p})' for p in BUSINESS_SUFFIXES), re.IGNORECASE)
+
+
+def has_business_suffix(name):
+    """Check if name contains business suffix."""
+    return bool(name) and BUSINESS_SUFFIX_RE.search(name) is not None
+
 
 def has_proxy_file():
     """Check if proxy file exists."""
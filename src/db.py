@@ -2,12 +2,35 @@
 Database operations for local.ch scraper
 """
 
+import queue
 import sqlite3
 import threading
+import time
 from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from log import logger
 
-# Thread lock for SQLite writes
-db_lock = threading.Lock()
+# Writes are serialized by the single writer thread and reads use their own
+# read-only connections, so this lock only guards starting/stopping the writer
+_writer_lock = threading.Lock()
+
+# Background writer thread (see start_writer)
+_write_queue = queue.Queue(maxsize=10000)
+_writer_thread = None
+_writer_path = None
+_writer_stats = {"inserted": 0, "skipped": 0, "failed": 0}
+
+# Writer batching: max rows per transaction, max seconds spent gathering them
+WRITER_BATCH_ROWS = 1000
+WRITER_BATCH_WAIT = 0.2
+WAL_SIZE_LIMIT = 64 * 1024 * 1024
+
+INSERT_SQL = """
+    INSERT OR IGNORE INTO businesses
+    (name, type, address, phone, email, website, source_url, scraped_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
 
 def init_database(db_path):
@@ -30,65 +53,268 @@ def init_database(db_path):
         )
     """)
 
+    # Exports read in name order; with this index they stream instead of sorting
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_businesses_name ON businesses(name)")
+
     conn.commit()
     conn.close()
     return db_path
 
 
-def save_business(db_path, business):
+class _WriteJob:
+    """Rows queued for the writer thread; done is set once they are committed."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.inserted = 0
+        self.failed = None  # rows that could not be written; None until settled
+        self.done = threading.Event()
+
+
+def _open_writer(db_path):
+    """Open the writer connection in WAL mode."""
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    # Truncate the WAL file back to this size after checkpoints
+    conn.execute(f"PRAGMA journal_size_limit={WAL_SIZE_LIMIT}")
+    return conn
+
+
+def _rollback(conn):
+    """Roll back the open transaction, if any."""
+    if conn.in_transaction:
+        conn.execute("ROLLBACK")
+
+
+def _insert_rows(conn, rows):
     """
-    Thread-safe save business to database.
-    Returns True if inserted, False if skipped (duplicate).
+    Insert rows one statement at a time in a single transaction.
+
+    A failing row only fails itself; the others are still committed.
+
+    Returns:
+        Tuple of (inserted, failed)
     """
-    with db_lock:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+    inserted = 0
+    failed = 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for row in rows:
+            try:
+                inserted += conn.execute(INSERT_SQL, row).rowcount
+            except sqlite3.Error as e:
+                failed += 1
+                logger.error(f"    [DB ERROR] {e}")
+        conn.execute("COMMIT")
+    except BaseException:
+        _rollback(conn)
+        raise
+    return inserted, failed
+
+
+def _write_jobs(conn, jobs):
+    """
+    Commit a group of jobs in one transaction and wake their callers.
+
+    If the group transaction fails, each job is retried in its own
+    transaction, so one bad row cannot discard other workers' rows.
+    Callers are always woken, even on unexpected errors.
+    """
+    try:
         try:
-            cursor.execute("""
-                INSERT OR IGNORE INTO businesses
-                (name, type, address, phone, email, website, source_url, scraped_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                business.get("name"),
-                business.get("type"),
-                business.get("address"),
-                business.get("phone"),
-                business.get("email"),
-                business.get("website"),
-                business.get("source_url"),
-                business.get("scraped_at", datetime.now().isoformat())
-            ))
-            conn.commit()
-            inserted = cursor.rowcount > 0
+            conn.execute("BEGIN IMMEDIATE")
+            for job in jobs:
+                job.inserted = conn.executemany(INSERT_SQL, job.rows).rowcount
+            conn.execute("COMMIT")
+            for job in jobs:
+                job.failed = 0
         except sqlite3.Error as e:
-            print(f"    [DB ERROR] {e}")
-            inserted = False
-        finally:
-            conn.close()
-        return inserted
+            _rollback(conn)
+            logger.error(f"    [DB ERROR] {e} - retrying {len(jobs)} job(s) row by row")
+            for job in jobs:
+                try:
+                    job.inserted, job.failed = _insert_rows(conn, job.rows)
+                except sqlite3.Error as e:
+                    job.inserted, job.failed = 0, len(job.rows)
+                    logger.error(f"    [DB ERROR] {e}")
+    except Exception as e:
+        _rollback(conn)
+        logger.error(f"    [DB ERROR] Writer failed: {e}")
+    finally:
+        for job in jobs:
+            if job.failed is None:
+                job.inserted, job.failed = 0, len(job.rows)
+            _writer_stats["inserted"] += job.inserted
+            _writer_stats["failed"] += job.failed
+            _writer_stats["skipped"] += len(job.rows) - job.inserted - job.failed
+            job.done.set()
 
 
-def get_stats(db_path):
-    """Get database statistics."""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+def _writer_loop(conn):
+    """
+    Drain the write queue until the stop sentinel (None) arrives.
+
+    Jobs that are already queued are grouped into one transaction, up to
+    WRITER_BATCH_ROWS rows or WRITER_BATCH_WAIT seconds. The group is
+    committed as soon as the queue runs dry, so callers never wait for a
+    batch to fill up.
+    """
+    stop = False
+    while not stop:
+        job = _write_queue.get()
+        if job is None:
+            break
 
-    stats = {}
+        jobs = [job]
+        rows = len(job.rows)
+        deadline = time.monotonic() + WRITER_BATCH_WAIT
+        while rows < WRITER_BATCH_ROWS and time.monotonic() < deadline:
+            try:
+                job = _write_queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                stop = True
+                break
+            jobs.append(job)
+            rows += len(job.rows)
 
-    cursor.execute("SELECT COUNT(*) FROM businesses")
-    stats["total"] = cursor.fetchone()[0]
+        _write_jobs(conn, jobs)
+
+    # Fold the WAL back into the database so the .db file is complete on its own
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except sqlite3.Error as e:
+        logger.error(f"    [DB ERROR] Checkpoint failed: {e}")
+    conn.close()
 
-    cursor.execute("SELECT COUNT(*) FROM businesses WHERE email IS NOT NULL AND email != ''")
-    stats["with_email"] = cursor.fetchone()[0]
 
-    cursor.execute("SELECT COUNT(*) FROM businesses WHERE website IS NOT NULL AND website != ''")
-    stats["with_website"] = cursor.fetchone()[0]
+def _stop_writer_locked():
+    """Stop the writer thread (caller holds _writer_lock)."""
+    global _writer_thread, _writer_path
+    if _writer_thread is not None:
+        _write_queue.put(None)
+        _writer_thread.join()
+    _writer_thread = None
+    _writer_path = None
 
-    cursor.execute("SELECT COUNT(*) FROM businesses WHERE phone IS NOT NULL AND phone != ''")
-    stats["with_phone"] = cursor.fetchone()[0]
 
-    cursor.execute("SELECT COUNT(*) FROM businesses WHERE type IS NOT NULL AND type != ''")
-    stats["with_type"] = cursor.fetchone()[0]
+def start_writer(db_path):
+    """Start the background writer thread for db_path (no-op if already running)."""
+    global _writer_thread, _writer_path, _writer_stats
+    with _writer_lock:
+        if _writer_thread is not None:
+            if _writer_path == db_path:
+                return
+            _stop_writer_locked()
+
+        conn = _open_writer(db_path)
+        _writer_stats = {"inserted": 0, "skipped": 0, "failed": 0}
+        _writer_path = db_path
+        _writer_thread = threading.Thread(
+            target=_writer_loop, args=(conn,), name="db-writer", daemon=True
+        )
+        _writer_thread.start()
+
+
+def stop_writer():
+    """
+    Flush pending rows and stop the writer thread.
+
+    Returns:
+        Dict with aggregate inserted/skipped/failed counts since start_writer
+    """
+    with _writer_lock:
+        _stop_writer_locked()
+        return dict(_writer_stats)
+
+
+def _connect_readonly(db_path):
+    """Open a read-only connection (does not contend with the writer)."""
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True)
+
+
+def _business_row(business):
+    """Convert a business dict to an INSERT parameter tuple."""
+    return (
+        business.get("name"),
+        business.get("type"),
+        business.get("address"),
+        business.get("phone"),
+        business.get("email"),
+        business.get("website"),
+        business.get("source_url"),
+        business.get("scraped_at", datetime.now().isoformat())
+    )
+
+
+def save_businesses(db_path, businesses):
+    """
+    Thread-safe bulk save businesses to database.
+    Rows are handed to the writer thread, which commits them together with
+    rows queued by other workers. Blocks until they are committed.
+    Returns dict with inserted, skipped (duplicates) and failed row counts.
+    """
+    if _writer_thread is None or _writer_path != db_path:
+        start_writer(db_path)
+
+    rows = (_business_row(business) for business in businesses)
+    jobs = []
+    while True:
+        batch = list(islice(rows, WRITER_BATCH_ROWS))
+        if not batch:
+            break
+        job = _WriteJob(batch)
+        _write_queue.put(job)
+        jobs.append(job)
+
+    for job in jobs:
+        job.done.wait()
+    inserted = sum(job.inserted for job in jobs)
+    failed = sum(job.failed for job in jobs)
+    return {
+        "inserted": inserted,
+        "skipped": sum(len(job.rows) for job in jobs) - inserted - failed,
+        "failed": failed
+    }
+
+
+def save_business(db_path, business):
+    """
+    Thread-safe save business to database.
+    Returns True if inserted, False if skipped (duplicate) or failed.
+    """
+    return save_businesses(db_path, [business])["inserted"] > 0
+
+
+def get_stats(db_path):
+    """Get database statistics."""
+    conn = _connect_readonly(db_path)
+    cursor = conn.cursor()
+
+    # One pass over the table; SUM is NULL on an empty table, hence "or 0"
+    cursor.execute("""
+        SELECT
+            COUNT(*),
+            SUM(email IS NOT NULL AND email != ''),
+            SUM(website IS NOT NULL AND website != ''),
+            SUM(phone IS NOT NULL AND phone != ''),
+            SUM(type IS NOT NULL AND type != '')
+        FROM businesses
+    """)
+    total, with_email, with_website, with_phone, with_type = cursor.fetchone()
+
+    stats = {
+        "total": total,
+        "with_email": with_email or 0,
+        "with_website": with_website or 0,
+        "with_phone": with_phone or 0,
+        "with_type": with_type or 0
+    }
 
     conn.close()
     return stats
@@ -96,7 +322,7 @@ def get_stats(db_path):
 
 def get_all_source_urls(db_path):
     """Get all source URLs from database."""
-    conn = sqlite3.connect(db_path)
+    conn = _connect_readonly(db_path)
     cursor = conn.cursor()
     cursor.execute("SELECT source_url FROM businesses")
     urls = [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,107 @@
+"""
+Excel export helpers for local.ch scraper
+"""
+
+import xlsxwriter
+
+from config import has_business_suffix
+
+# Rows fetched from SQLite per round trip
+FETCH_SIZE = 10000
+
+# Upper bound for auto-sized column widths
+MAX_COLUMN_WIDTH = 50
+
+# Business classification as a SQL predicate (never NULL, so NOT works too):
+# type or website populated, or a business suffix in the name.
+# Requires register_functions() on the connection.
+IS_BUSINESS_SQL = """(
+    IFNULL(TRIM(type), '') != ''
+    OR IFNULL(TRIM(website), '') != ''
+    OR HAS_BUSINESS_SUFFIX(name)
+)"""
+
+
+def register_functions(conn):
+    """Register the SQL functions used by IS_BUSINESS_SQL on a connection."""
+    conn.create_function("HAS_BUSINESS_SUFFIX", 1, has_business_suffix, deterministic=True)
+
+
+def write_xlsx(cursor, output_file, sheet_name):
+    """
+    Stream query results into a single-sheet Excel file.
+
+    Rows go from the cursor straight into a constant-memory workbook and
+    column widths are measured while writing, so memory use is bounded by
+    one fetch regardless of table size.
+
+    Args:
+        cursor: Executed sqlite3 cursor
+        output_file: Path to .xlsx file
+        sheet_name: Worksheet name
+
+    Returns:
+        Number of rows written
+    """
+    columns = [d[0] for d in cursor.description]
+    cursor.arraysize = FETCH_SIZE
+
+    # Write every value as plain text, like the openpyxl export did: URL cells
+    # would otherwise hit Excel's 65,530 hyperlink limit and be dropped
+    workbook = xlsxwriter.Workbook(output_file, {
+        'constant_memory': True,
+        'strings_to_urls': False,
+        'strings_to_formulas': False
+    })
+    worksheet = workbook.add_worksheet(sheet_name)
+    header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    worksheet.write_row(0, 0, columns, header_format)
+
+    widths = [len(col) for col in columns]
+    count = 0
+    while rows := cursor.fetchmany():
+        for row in rows:
+            count += 1
+            worksheet.write_row(count, 0, row)
+            for idx, value in enumerate(row):
+                if value is not None:
+                    widths[idx] = max(widths[idx], len(str(value)))
+
+    # Column info is emitted on close, so widths can be set after the rows
+    for idx, width in enumerate(widths):
+        worksheet.set_column(idx, idx, min(width + 2, MAX_COLUMN_WIDTH))
+    workbook.close()
+
+    return count
+
+
+def write_parquet(cursor, output_file):
+    """
+    Stream query results into a Parquet file (zstd, dictionary-encoded).
+
+    Every column is written as a string column, matching the TEXT schema
+    of the businesses table. Requires pyarrow, imported on first use so
+    Excel-only installs do not need it.
+
+    Args:
+        cursor: Executed sqlite3 cursor
+        output_file: Path to .parquet file
+
+    Returns:
+        Number of rows written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = [d[0] for d in cursor.description]
+    schema = pa.schema([(col, pa.string()) for col in columns])
+    cursor.arraysize = FETCH_SIZE
+
+    count = 0
+    with pq.ParquetWriter(output_file, schema, compression='zstd', use_dictionary=True) as writer:
+        while rows := cursor.fetchmany():
+            arrays = [pa.array(values, type=pa.string()) for values in zip(*rows)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            count += len(rows)
+
+    return count
@@ -0,0 +1,32 @@
+"""
+Non-blocking logging for local.ch scraper
+
+Workers only enqueue log records; a single listener thread writes them
+to stdout, so threads never wait on the stdout lock.
+"""
+
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+
+logger = logging.getLogger("scraper")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+_log_queue = queue.Queue()
+logger.addHandler(QueueHandler(_log_queue))
+
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+
+_listener = QueueListener(_log_queue, _stdout_handler)
+_listener.start()
+atexit.register(_listener.stop)
+
+
+def flush_log():
+    """Block until every queued record has been written to stdout."""
+    _log_queue.join()
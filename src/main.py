@@ -2,37 +2,44 @@
 local.ch Scraper - Interactive Console Application
 """
 
+import importlib.util
+import inspect
 import json
 import os
 import re
+import subprocess
 import sys
 from urllib.parse import urlparse, unquote
 
 from config import (
     has_proxy_file, ensure_output_dir, get_db_path, BASE_DIR, DATA_DIR,
     DEFAULT_PAGES, DEFAULT_WORKERS, DEFAULT_WORKERS_NO_PROXY,
-    DEFAULT_MAX_ERRORS, DEFAULT_DELAY, DEFAULT_PROXY_COOLDOWN
+    DEFAULT_MAX_ERRORS, DEFAULT_DELAY, DEFAULT_PROXY_COOLDOWN,
+    DEFAULT_HTTP_CONCURRENCY
 )
 from db import init_database, get_stats
 from scraper import (
-    get_driver, extract_links_paginated,
+    get_driver, quit_driver, extract_links_paginated,
     load_links_progress, save_links_progress, delete_links_file
 )
 from proxy import load_proxies, ProxyPool
 from worker import run_workers
 
+# Script modules already imported by run_script (path -> module)
+_loaded_scripts = {}
+
+# derive_db_name cleanup patterns
+_NONALNUM_RE = re.compile(r'[^a-zA-Z0-9]')
+_UNDERSCORES_RE = re.compile(r'_+')
+
 
 def list_databases():
     """List available databases in data/ folder."""
     if not os.path.exists(DATA_DIR):
         return []
 
-    databases = []
-    for f in os.listdir(DATA_DIR):
-        if f.endswith(".db"):
-            databases.append(f)
-
-    return sorted(databases)
+    with os.scandir(DATA_DIR) as entries:
+        return sorted(e.name for e in entries if e.name.endswith(".db") and e.is_file())
 
 
 def print_banner():
@@ -48,12 +55,8 @@ def list_link_files():
     if not os.path.exists(DATA_DIR):
         return []
 
-    link_files = []
-    for f in os.listdir(DATA_DIR):
-        if f.endswith("_links.json"):
-            link_files.append(f)
-
-    return sorted(link_files)
+    with os.scandir(DATA_DIR) as entries:
+        return sorted(e.name for e in entries if e.name.endswith("_links.json") and e.is_file())
 
 
 def print_main_menu():
@@ -83,8 +86,8 @@ def derive_db_name(url):
         if len(parts) >= 4 and parts[2] == "s":
             region = unquote(parts[3])  # URL decode
             # Clean up: remove special chars, lowercase
-            region = re.sub(r'[^a-zA-Z0-9]', '_', region).lower()
-            region = re.sub(r'_+', '_', region).strip('_')
+            region = _NONALNUM_RE.sub('_', region).lower()
+            region = _UNDERSCORES_RE.sub('_', region).strip('_')
             return f"{region}.db"
     except:
         pass
@@ -125,17 +128,20 @@ def prompt_int(prompt, default, min_val=1, max_val=None):
         response = input(f"  {prompt} [{default}]: ").strip()
         if not response:
             return default
-        try:
-            value = int(response)
-            if value < min_val:
-                print(f"  [!] Value must be at least {min_val}")
-                continue
-            if max_val and value > max_val:
-                print(f"  [!] Value must be at most {max_val}")
-                continue
-            return value
-        except ValueError:
+        # Validate up front instead of trapping int()'s ValueError: same
+        # syntax int() accepts (optional sign, single "_" between digits)
+        digits = response[1:] if response[0] in "+-" else response
+        if not all(group.isdecimal() for group in digits.split("_")):
             print("  [!] Please enter a valid number")
+            continue
+        value = int(response)
+        if value < min_val:
+            print(f"  [!] Value must be at least {min_val}")
+            continue
+        if max_val and value > max_val:
+            print(f"  [!] Value must be at most {max_val}")
+            continue
+        return value
 
 
 def prompt_float(prompt, default, min_val=0):
@@ -183,6 +189,12 @@ def prompt_config():
 
     config["delay"] = prompt_float("Delay between requests (sec)", DEFAULT_DELAY, min_val=0)
 
+    # Business pages: Firefox (default) or plain HTTP for server-rendered pages
+    use_http = prompt_yes_no("Fetch business pages over plain HTTP (no browser)?", default=False)
+    config["renderer"] = "http" if use_http else "browser"
+    if use_http:
+        config["concurrency"] = prompt_int("Concurrent requests per worker", DEFAULT_HTTP_CONCURRENCY, min_val=1, max_val=50)
+
     return config
 
 
@@ -192,22 +204,51 @@ def list_scripts():
     if not os.path.exists(scripts_dir):
         return []
 
-    scripts = []
-    for f in os.listdir(scripts_dir):
-        if f.endswith(".py") and not f.startswith("_"):
-            scripts.append(f)
+    with os.scandir(scripts_dir) as entries:
+        return sorted(
+            e.name for e in entries
+            if e.name.endswith(".py") and not e.name.startswith("_") and e.is_file()
+        )
+
 
-    return sorted(scripts)
+def load_script(script_path):
+    """Import a script as a module (cached, so its imports load only once)."""
+    if script_path not in _loaded_scripts:
+        name = os.path.splitext(os.path.basename(script_path))[0]
+        spec = importlib.util.spec_from_file_location(f"scripts.{name}", script_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _loaded_scripts[script_path] = module
+    return _loaded_scripts[script_path]
 
 
 def run_script(script_name, db_path):
-    """Run a script with db_path argument."""
+    """
+    Run a script with db_path argument.
+
+    Scripts exposing main(db_path) run in-process; anything else runs in a
+    separate interpreter.
+    """
     script_path = os.path.join(BASE_DIR, "scripts", script_name)
-    if os.path.exists(script_path):
-        print(f"\n[*] Running {script_name}...")
-        os.system(f'python "{script_path}" "{db_path}"')
-    else:
+    if not os.path.exists(script_path):
         print(f"  [!] Script not found: {script_path}")
+        return
+
+    print(f"\n[*] Running {script_name}...")
+    try:
+        script_main = getattr(load_script(script_path), "main", None)
+        inspect.signature(script_main).bind(db_path)
+    except (TypeError, ValueError):
+        subprocess.run([sys.executable, script_path, db_path], check=False)
+        return
+    except Exception as e:
+        print(f"  [!] Failed to load {script_name}: {e}")
+        return
+
+    try:
+        script_main(db_path)
+    except Exception as e:
+        print(f"  [!] {script_name} failed: {e}")
 
 
 def prompt_run_scripts(db_path, standalone=False):
@@ -238,6 +279,16 @@ def prompt_run_scripts(db_path, standalone=False):
             return
 
 
+def print_stats(db_path, db_name):
+    """Print database statistics (one get_stats query)."""
+    stats = get_stats(db_path)
+    print(f"\n  Database ({db_name}):")
+    print(f"    Total records: {stats['total']}")
+    print(f"    With email:    {stats['with_email']}")
+    print(f"    With website:  {stats['with_website']}")
+    print(f"    With phone:    {stats['with_phone']}")
+
+
 def prompt_select_database():
     """Prompt user to select an existing database."""
     databases = list_databases()
@@ -247,13 +298,14 @@ def prompt_select_database():
         print("    Run a scrape first to create a database.")
         return None
 
+    # File size only: record counts are shown once a database is selected
     print("\n  Available databases:")
     for i, db in enumerate(databases, 1):
         db_path = os.path.join(DATA_DIR, db)
         try:
-            stats = get_stats(db_path)
-            print(f"    {i}. {db} ({stats['total']} records)")
-        except:
+            size_kb = os.path.getsize(db_path) / 1024
+            print(f"    {i}. {db} ({size_kb:.1f} KB)")
+        except OSError:
             print(f"    {i}. {db}")
     print(f"    0. Back to menu")
 
@@ -272,13 +324,7 @@ def run_export_mode():
 
     # Show database stats
     try:
-        stats = get_stats(db_path)
-        db_name = os.path.basename(db_path)
-        print(f"\n  Database: {db_name}")
-        print(f"    Total records: {stats['total']}")
-        print(f"    With email:    {stats['with_email']}")
-        print(f"    With website:  {stats['with_website']}")
-        print(f"    With phone:    {stats['with_phone']}")
+        print_stats(db_path, os.path.basename(db_path))
     except Exception as e:
         print(f"\n[!] Error reading database: {e}")
         return
@@ -340,6 +386,9 @@ def run_scrape_mode():
     print(f"    Workers: {config['workers']}")
     print(f"    Use proxies: {config['use_proxies']}")
     print(f"    Delay: {config['delay']}s")
+    print(f"    Renderer: {config['renderer']}")
+    if config["renderer"] == "http":
+        print(f"    Concurrency: {config['concurrency']} per worker")
     if links:
         print(f"    Links: {len(links)} (from file)")
     print("-" * 60)
@@ -377,7 +426,7 @@ def run_scrape_mode():
                 existing_links=links
             )
         finally:
-            driver.quit()
+            quit_driver(driver)
 
     if not links:
         print("\n[!] No links extracted. Check the URL and try again.")
@@ -398,16 +447,12 @@ def run_scrape_mode():
     print(f"    Inserted: {results['inserted']}")
     print(f"    Skipped:  {results['skipped']}")
     print(f"    Errors:   {results['errors']}")
+    print(f"    Dead links: {results['dead']}")
     if config["use_proxies"]:
         print(f"    Proxy swaps: {results['proxy_swaps']}")
 
     # Database stats
-    stats = get_stats(db_path)
-    print(f"\n  Database ({db_name}):")
-    print(f"    Total records: {stats['total']}")
-    print(f"    With email:    {stats['with_email']}")
-    print(f"    With website:  {stats['with_website']}")
-    print(f"    With phone:    {stats['with_phone']}")
+    print_stats(db_path, db_name)
 
     # Step 7: Optional scripts
     prompt_run_scripts(db_path)
@@ -426,6 +471,8 @@ def run_resume_mode():
         print("    Start a new scrape first.")
         return
 
+    # Parsed files are kept so the selected one is not decoded a second time
+    parsed = {}
     print("\n  Available link files:")
     for i, lf in enumerate(link_files, 1):
         lf_path = os.path.join(DATA_DIR, lf)
@@ -434,6 +481,7 @@ def run_resume_mode():
                 data = json.load(f)
                 status = "Complete" if data['completed'] else f"Page {data['last_page']}/{data['total_pages']}"
                 print(f"    {i}. {lf} ({data['link_count']} links, {status})")
+                parsed[lf] = data
         except:
             print(f"    {i}. {lf}")
     print(f"    0. Back to menu")
@@ -445,7 +493,8 @@ def run_resume_mode():
     selected_file = link_files[choice - 1]
     db_name = selected_file.replace('_links.json', '.db')
 
-    progress = load_links_progress(db_name)
+    progress = parsed.get(selected_file)
+    del parsed
     if not progress:
         print("\n[!] Error reading link file")
         return
@@ -493,11 +542,11 @@ def run_resume_mode():
                 print("\n\n[*] Interrupted - progress saved")
                 return
             finally:
-                driver.quit()
+                quit_driver(driver)
 
             if prompt_yes_no("\nProceed to scraping?", default=True):
                 action = 2
-                progress = load_links_progress(db_name)  # Reload with new links
+                progress['links'] = links
             else:
                 return
 
@@ -530,13 +579,9 @@ def run_resume_mode():
         print(f"    Inserted: {results['inserted']}")
         print(f"    Skipped:  {results['skipped']}")
         print(f"    Errors:   {results['errors']}")
+        print(f"    Dead links: {results['dead']}")
 
-        stats = get_stats(db_path)
-        print(f"\n  Database ({db_name}):")
-        print(f"    Total records: {stats['total']}")
-        print(f"    With email:    {stats['with_email']}")
-        print(f"    With website:  {stats['with_website']}")
-        print(f"    With phone:    {stats['with_phone']}")
+        print_stats(db_path, db_name)
 
         prompt_run_scripts(db_path)
 
@@ -2,9 +2,13 @@
 Proxy management for local.ch scraper
 """
 
+import heapq
 import time
 import threading
+from collections import deque
+from contextlib import contextmanager
 from config import PROXY_FILE, DEFAULT_PROXY_COOLDOWN
+from log import logger
 
 
 def load_proxies(filepath=None):
@@ -26,10 +30,59 @@ def load_proxies(filepath=None):
         return []
 
 
+class RWLock:
+    """
+    Reader-writer lock: any number of readers, or one exclusive writer.
+
+    Waiting writers block new readers, so a steady stream of readers
+    cannot starve a writer.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read_lock(self):
+        """Hold the lock shared for the duration of the block."""
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write_lock(self):
+        """Hold the lock exclusively for the duration of the block."""
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
 class ProxyPool:
     """
     Thread-safe proxy pool with hot/cold management.
 
+    Queries run under a shared read lock; only changes to the pool take
+    the exclusive write lock.
+
     Cold proxies: Available for use
     Hot proxies: Recently failed, in cooldown period
     """
@@ -42,52 +95,127 @@ class ProxyPool:
             proxies: List of proxy strings
             cooldown: Seconds before hot proxy becomes cold (default: 300)
         """
-        self.lock = threading.Lock()
-        self.cold_proxies = list(proxies)
+        self.lock = RWLock()
+        # FIFO of cold proxies; _cold_set is the source of truth for
+        # membership, so entries missing from it are stale and skipped
+        self.cold_proxies = deque(proxies)
+        self._cold_set = set(proxies)
         self.hot_proxies = {}  # proxy -> timestamp when marked hot
+        # (cooldown expiry, proxy), soonest first; entries whose proxy was
+        # re-marked since are stale and dropped when they reach the top
+        self._hot_heap = []
         self.cooldown = cooldown or DEFAULT_PROXY_COOLDOWN
         self.assigned = {}  # worker_id -> proxy
+        # Signalled when the pool changes (see get_proxy_blocking)
+        self._cv = threading.Condition(threading.Lock())
+        self._generation = 0
+
+    def _has_expired(self, now):
+        """Check if the soonest cooldown has expired (caller holds a lock)."""
+        return bool(self._hot_heap) and self._hot_heap[0][0] <= now
+
+    def _notify(self):
+        """Wake threads waiting in get_proxy_blocking."""
+        with self._cv:
+            self._generation += 1
+            self._cv.notify_all()
 
     def _refresh_cooled_proxies(self):
-        """Move cooled-down proxies from hot back to cold."""
+        """
+        Move cooled-down proxies from hot back to cold.
+
+        Checks under the read lock and only takes the write lock when
+        something has actually cooled.
+        """
         now = time.time()
-        cooled = []
+        with self.lock.read_lock():
+            if not self._has_expired(now):
+                return
 
-        for proxy, timestamp in list(self.hot_proxies.items()):
-            if now - timestamp >= self.cooldown:
-                cooled.append(proxy)
+        cooled = False
+        with self.lock.write_lock():
+            while self._has_expired(now):
+                expiry, proxy = heapq.heappop(self._hot_heap)
+                timestamp = self.hot_proxies.get(proxy)
+                if timestamp is None or timestamp + self.cooldown != expiry:
+                    continue
+                del self.hot_proxies[proxy]
+                if proxy not in self._cold_set:
+                    self.cold_proxies.append(proxy)
+                    self._cold_set.add(proxy)
+                    cooled = True
 
-        for proxy in cooled:
-            del self.hot_proxies[proxy]
-            if proxy not in self.cold_proxies:
-                self.cold_proxies.append(proxy)
+        if cooled:
+            self._notify()
 
     def get_proxy(self, worker_id):
         """
         Get an available proxy for a worker.
 
+        A worker keeps its assigned proxy until it marks it hot, so the
+        common case is answered from the worker's own slot without
+        taking the lock; only the worker itself ever replaces that slot.
+
         Args:
             worker_id: Worker identifier
 
         Returns:
             Proxy string or None if no proxies available
         """
-        with self.lock:
-            self._refresh_cooled_proxies()
+        # Fast path: single dict reads, atomic without the lock
+        current = self.assigned.get(worker_id)
+        if current is not None and current not in self.hot_proxies:
+            return current
+
+        self._refresh_cooled_proxies()
+
+        with self.lock.write_lock():
+
+            # Get a new cold proxy, dropping stale entries on the way
+            while self.cold_proxies:
+                proxy = self.cold_proxies.popleft()
+                if proxy in self._cold_set:
+                    self._cold_set.discard(proxy)
+                    self.assigned[worker_id] = proxy
+                    return proxy
+            return None
+
+    def get_proxy_blocking(self, worker_id, timeout):
+        """
+        Get an available proxy, waiting for one to cool down if needed.
+
+        Sleeps until the next cooldown expiry or until the pool changes,
+        rather than polling.
+
+        Args:
+            worker_id: Worker identifier
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Proxy string or None if none became available in time
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cv:
+                generation = self._generation
 
-            # Return current assigned proxy if still cold
-            if worker_id in self.assigned:
-                current = self.assigned[worker_id]
-                if current in self.cold_proxies:
-                    return current
+            proxy = self.get_proxy(worker_id)
+            if proxy:
+                return proxy
 
-            # Get a new cold proxy
-            if not self.cold_proxies:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
                 return None
 
-            proxy = self.cold_proxies.pop(0)
-            self.assigned[worker_id] = proxy
-            return proxy
+            with self.lock.read_lock():
+                next_expiry = self._hot_heap[0][0] if self._hot_heap else None
+            if next_expiry is not None:
+                remaining = min(remaining, max(next_expiry - time.time(), 0.01))
+
+            # Skip the wait if the pool changed since get_proxy looked at it
+            with self._cv:
+                if self._generation == generation:
+                    self._cv.wait(timeout=remaining)
 
     def mark_hot(self, proxy, worker_id):
         """
@@ -97,13 +225,17 @@ class ProxyPool:
             proxy: Proxy string
             worker_id: Worker identifier
         """
-        with self.lock:
-            self.hot_proxies[proxy] = time.time()
-            if proxy in self.cold_proxies:
-                self.cold_proxies.remove(proxy)
+        with self.lock.write_lock():
+            now = time.time()
+            self.hot_proxies[proxy] = now
+            heapq.heappush(self._hot_heap, (now + self.cooldown, proxy))
+            # Leaves a stale deque entry behind; get_proxy skips it
+            self._cold_set.discard(proxy)
             if worker_id in self.assigned and self.assigned[worker_id] == proxy:
                 del self.assigned[worker_id]
-            print(f"    [PROXY] Marked {proxy} as HOT (cooldown: {self.cooldown}s)")
+        # Waiters re-plan their sleep around the new cooldown expiry
+        self._notify()
+        logger.info(f"    [PROXY] Marked {proxy} as HOT (cooldown: {self.cooldown}s)")
 
     def status(self):
         """
@@ -112,16 +244,15 @@ class ProxyPool:
         Returns:
             Dict with cold and hot counts
         """
-        with self.lock:
-            self._refresh_cooled_proxies()
+        self._refresh_cooled_proxies()
+        with self.lock.read_lock():
             return {
-                "cold": len(self.cold_proxies),
+                "cold": len(self._cold_set),
                 "hot": len(self.hot_proxies),
-                "total": len(self.cold_proxies) + len(self.hot_proxies)
+                "total": len(self._cold_set) + len(self.hot_proxies)
             }
 
     def has_available(self):
-        """Check if any proxies are available."""
-        with self.lock:
-            self._refresh_cooled_proxies()
-            return len(self.cold_proxies) > 0
+        """Check if any proxies are available (approximate, lock-free)."""
+        self._refresh_cooled_proxies()
+        return len(self._cold_set) > 0
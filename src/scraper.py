@@ -2,22 +2,56 @@
 Core scraping functions for local.ch
 """
 
+import atexit
 import json
 import os
 import re
+import threading
 import time
 from datetime import datetime
+import httpx
+from selectolax.lexbor import LexborHTMLParser as HTMLParser
 from selenium import webdriver
 from selenium.webdriver.firefox.service import Service
 from selenium.webdriver.firefox.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
 from config import (
     FIREFOX_PATH, GECKODRIVER_PATH, HEADLESS,
-    PAGE_LOAD_TIMEOUT, ELEMENT_WAIT_TIMEOUT, DATA_DIR
+    PAGE_LOAD_TIMEOUT, ELEMENT_WAIT_TIMEOUT, DATA_DIR, HTTP_USER_AGENT,
+    DEFAULT_HTTP_CONCURRENCY, HTTP_KEEPALIVE_EXPIRY, PROBE_TIMEOUT
 )
+from log import logger, flush_log
+
+# Business page filters (see _pick_type / _pick_address)
+_POSTAL_RE = re.compile(r'\b\d{4}\b')
+_H2_STOP_RE = re.compile(r'privacy|cookie', re.IGNORECASE)
+_ADDR_STOP_RE = re.compile(r'stelle|valutazione', re.IGNORECASE)
+
+# Business links on a search results page, used by extract_links_from_page
+_RESULT_LINKS_JS = """
+return [...document.querySelectorAll("div.lR")]
+    .map(div => div.querySelector("a"))
+    .map(a => a ? a.href : "")
+    .filter(href => href.includes("/d/"));
+"""
+
+# Raw business page fields, collected in the browser by extract_all_data
+_PAGE_DATA_JS = """
+// Like Selenium's .text: "" for elements that are not rendered
+const shown = el => el.checkVisibility ? el.checkVisibility() : el.getClientRects().length > 0;
+const text = el => el ? (shown(el) ? el.innerText.trim() : "") : null;
+const all = sel => [...document.querySelectorAll(sel)];
+return {
+    name: text(document.querySelector("h1")),
+    h2s: all("h2").map(text),
+    buttons: all("button").map(text),
+    phone: text(document.querySelector("a[href^='tel:']")),
+    email: text(document.querySelector("a[href^='mailto:']")),
+    links: all("a[data-testid='contact-link']").map(a => a.href)
+};
+"""
 
 
 def get_links_file_path(db_name):
@@ -79,6 +113,27 @@ def delete_links_file(db_name):
         os.remove(links_file)
 
 
+# HTTP statuses that mean the business page was removed
+_DEAD_STATUSES = {404, 410}
+
+# Drivers from get_driver not yet quit; see quit_driver
+_live_drivers = set()
+_live_drivers_lock = threading.Lock()
+
+
+def _proxy_prefs(proxy):
+    """Firefox preferences routing HTTP(S) through proxy ("host:port")."""
+    proxy_host, proxy_port = proxy.split(":")
+    return {
+        "network.proxy.type": 1,
+        "network.proxy.http": proxy_host,
+        "network.proxy.http_port": int(proxy_port),
+        "network.proxy.ssl": proxy_host,
+        "network.proxy.ssl_port": int(proxy_port),
+        "network.proxy.no_proxies_on": "",
+    }
+
+
 def get_driver(proxy=None):
     """
     Initialize Firefox WebDriver.
@@ -95,15 +150,13 @@ def get_driver(proxy=None):
     if HEADLESS:
         options.add_argument("--headless")
 
+    # Lets set_driver_proxy change prefs in the running browser
+    options.add_argument("-remote-allow-system-access")
+
     # Configure proxy if provided
     if proxy:
-        proxy_host, proxy_port = proxy.split(":")
-        options.set_preference("network.proxy.type", 1)
-        options.set_preference("network.proxy.http", proxy_host)
-        options.set_preference("network.proxy.http_port", int(proxy_port))
-        options.set_preference("network.proxy.ssl", proxy_host)
-        options.set_preference("network.proxy.ssl_port", int(proxy_port))
-        options.set_preference("network.proxy.no_proxies_on", "")
+        for name, value in _proxy_prefs(proxy).items():
+            options.set_preference(name, value)
 
     # Timeout settings
     options.set_preference("dom.max_script_run_time", 30)
@@ -111,30 +164,82 @@ def get_driver(proxy=None):
 
     service = Service(GECKODRIVER_PATH)
     driver = webdriver.Firefox(service=service, options=options)
-    driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    with _live_drivers_lock:
+        _live_drivers.add(driver)
+
+    try:
+        driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    except:
+        quit_driver(driver)
+        raise
 
     return driver
 
 
-def safe_extract(driver, selector, attribute=None):
+def quit_driver(driver):
     """
-    Safely extract text or attribute from an element.
+    Quit a driver from get_driver. Safe to call more than once.
 
     Args:
         driver: WebDriver instance
-        selector: CSS selector
-        attribute: Optional attribute to extract (default: text)
+    """
+    with _live_drivers_lock:
+        _live_drivers.discard(driver)
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.error(f"[!] Failed to quit browser: {e}")
+
+
+@atexit.register
+def _quit_live_drivers():
+    """Quit browsers still running at exit so no Firefox is left behind."""
+    with _live_drivers_lock:
+        drivers = list(_live_drivers)
+    for driver in drivers:
+        quit_driver(driver)
+
+
+def set_driver_proxy(driver, proxy):
+    """
+    Switch a running Firefox to another proxy without restarting it.
+
+    Args:
+        driver: WebDriver instance
+        proxy: Proxy string "host:port"
+    """
+    with driver.context(driver.CONTEXT_CHROME):
+        driver.execute_script("""
+            for (const [name, value] of Object.entries(arguments[0])) {
+                if (typeof value === "number") Services.prefs.setIntPref(name, value);
+                else Services.prefs.setStringPref(name, value);
+            }
+        """, _proxy_prefs(proxy))
+    driver.delete_all_cookies()
+
+
+def wait_ready(driver, selector, timeout=ELEMENT_WAIT_TIMEOUT):
+    """
+    Wait until the page has loaded and selector is present.
+
+    Polls every 50 ms and returns as soon as both hold; gives up silently
+    after timeout so callers extract whatever is there.
+
+    Args:
+        driver: WebDriver instance
+        selector: CSS selector that marks the page as ready
+        timeout: Max seconds to wait
 
     Returns:
-        Extracted value or None
+        True if the page became ready, False on timeout
     """
+    wait = WebDriverWait(driver, timeout, poll_frequency=0.05)
     try:
-        element = driver.find_element(By.CSS_SELECTOR, selector)
-        if attribute:
-            return element.get_attribute(attribute)
-        return element.text.strip()
+        wait.until(lambda d: d.execute_script("return document.readyState") == "complete"
+                   and d.find_elements(By.CSS_SELECTOR, selector))
+        return True
     except:
-        return None
+        return False
 
 
 def extract_links_from_page(driver, url):
@@ -149,30 +254,10 @@ def extract_links_from_page(driver, url):
         List of business page URLs
     """
     driver.get(url)
+    wait_ready(driver, "div.lR")
 
-    wait = WebDriverWait(driver, ELEMENT_WAIT_TIMEOUT)
-    try:
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "div.lR")))
-    except:
-        pass
-
-    time.sleep(1)
-
-    links = []
-    try:
-        result_divs = driver.find_elements(By.CSS_SELECTOR, "div.lR")
-        for div in result_divs:
-            try:
-                link = div.find_element(By.TAG_NAME, "a")
-                href = link.get_attribute("href")
-                if href and "/d/" in href:
-                    links.append(href)
-            except:
-                continue
-    except:
-        pass
-
-    return links
+    # First link of each result, filtered in the browser (one round trip)
+    return driver.execute_script(_RESULT_LINKS_JS)
 
 
 def extract_links_paginated(driver, base_url, num_pages, delay=0.5, db_name=None, start_page=1, existing_links=None):
@@ -192,9 +277,10 @@ def extract_links_paginated(driver, base_url, num_pages, delay=0.5, db_name=None
         List of unique business page URLs
     """
     all_links = list(existing_links) if existing_links else []
+    seen = set(all_links)  # membership index for all_links
 
     if start_page > 1:
-        print(f"[*] Resuming from page {start_page} ({len(all_links)} links already collected)")
+        logger.info(f"[*] Resuming from page {start_page} ({len(all_links)} links already collected)")
 
     for page in range(start_page, num_pages + 1):
         if page == 1:
@@ -205,29 +291,63 @@ def extract_links_paginated(driver, base_url, num_pages, delay=0.5, db_name=None
         try:
             page_links = extract_links_from_page(driver, url)
 
-            # Add only unique links
-            new_links = [link for link in page_links if link not in all_links]
+            # Add only unique links (also within the page itself)
+            new_links = []
+            for link in page_links:
+                if link not in seen:
+                    seen.add(link)
+                    new_links.append(link)
             all_links.extend(new_links)
 
-            print(f"[*] Page {page}/{num_pages}: {len(page_links)} links ({len(new_links)} new) - Total: {len(all_links)}")
+            logger.info(f"[*] Page {page}/{num_pages}: {len(page_links)} links ({len(new_links)} new) - Total: {len(all_links)}")
 
             # Save progress after each page
             if db_name:
                 save_links_progress(db_name, base_url, num_pages, page, all_links, completed=(page == num_pages))
 
         except Exception as e:
-            print(f"[!] Error on page {page}: {e}")
+            logger.error(f"[!] Error on page {page}: {e}")
             # Save progress even on error
             if db_name:
                 save_links_progress(db_name, base_url, num_pages, page - 1, all_links, completed=False)
+            flush_log()
             raise
 
         if page < num_pages:
             time.sleep(delay)
 
+    flush_log()
     return all_links
 
 
+def _pick_type(texts):
+    """Pick the business type from h2 texts (skips privacy/cookie banners)."""
+    for text in texts:
+        if text and not _H2_STOP_RE.search(text):
+            if " in " in text or len(text) < 100:
+                return text
+    return None
+
+
+def _pick_address(texts):
+    """Pick the address from button texts (first one with a postal code)."""
+    for text in texts:
+        if text and _POSTAL_RE.search(text):
+            if not _ADDR_STOP_RE.search(text):
+                return text
+    return None
+
+
+def _pick_website(hrefs):
+    """Pick the website from contact-link hrefs (external links only)."""
+    for href in hrefs:
+        if href and href.startswith("http"):
+            # Skip internal local.ch links and WhatsApp
+            if "local.ch" not in href and "wa.me" not in href and "whatsapp" not in href:
+                return href
+    return None
+
+
 def extract_all_data(driver, url):
     """
     Extract ALL business data from a single business page in one visit.
@@ -242,71 +362,182 @@ def extract_all_data(driver, url):
         Dictionary with all business data
     """
     driver.get(url)
+    wait_ready(driver, "h1")
 
-    wait = WebDriverWait(driver, ELEMENT_WAIT_TIMEOUT)
-    try:
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "h1")))
-    except:
-        pass
+    # One round trip for every field; filters are applied in Python
+    data = driver.execute_script(_PAGE_DATA_JS)
 
-    time.sleep(0.5)
+    business_type = _pick_type(data["h2s"])
+    address = _pick_address(data["buttons"])
+    website = _pick_website(data["links"])
 
-    # Extract name (h1)
-    name = safe_extract(driver, "h1")
+    return {
+        "name": data["name"],
+        "type": business_type,
+        "address": address,
+        "phone": data["phone"],
+        "email": data["email"],
+        "website": website,
+        "source_url": url,
+        "scraped_at": datetime.now().isoformat()
+    }
 
-    # Extract type (h2, filtered)
-    business_type = None
-    try:
-        h2_elements = driver.find_elements(By.CSS_SELECTOR, "h2")
-        for h2 in h2_elements:
-            text = h2.text.strip()
-            if text and "privacy" not in text.lower() and "cookie" not in text.lower():
-                if " in " in text or len(text) < 100:
-                    business_type = text
-                    break
-    except:
-        pass
 
-    # Extract phone
-    phone = safe_extract(driver, "a[href^='tel:']")
+def _http_client_options(proxy, max_connections):
+    """Shared httpx client settings: one keep-alive pool per proxy."""
+    return {
+        "proxy": f"http://{proxy}" if proxy else None,
+        "http2": True,
+        "timeout": httpx.Timeout(PAGE_LOAD_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        "follow_redirects": True,
+        "headers": {"User-Agent": HTTP_USER_AGENT},
+    }
+
 
-    # Extract email
-    email = safe_extract(driver, "a[href^='mailto:']")
+def get_http_client(proxy=None):
+    """
+    Initialize an HTTP client for the "http" renderer.
 
-    # Extract address (button with postal code)
-    address = None
-    try:
-        buttons = driver.find_elements(By.CSS_SELECTOR, "button")
-        for btn in buttons:
-            text = btn.text.strip()
-            if text and re.search(r'\b\d{4}\b', text):
-                if "stelle" not in text.lower() and "valutazione" not in text.lower():
-                    address = text
-                    break
-    except:
-        pass
+    The client is kept for as long as the worker uses the proxy, so
+    connections (TLS sessions, HTTP/2 streams) are reused across links.
+
+    Args:
+        proxy: Optional proxy string "host:port"
 
-    # Extract website (external links only)
-    website = None
+    Returns:
+        httpx.Client instance
+    """
+    return httpx.Client(**_http_client_options(proxy, max_connections=1))
+
+
+def get_async_http_client(proxy=None, max_connections=DEFAULT_HTTP_CONCURRENCY):
+    """
+    Initialize an async HTTP client for concurrent "http" workers.
+
+    Args:
+        proxy: Optional proxy string "host:port"
+        max_connections: Connection pool size (requests in flight)
+
+    Returns:
+        httpx.AsyncClient instance
+    """
+    return httpx.AsyncClient(**_http_client_options(proxy, max_connections))
+
+
+def quick_probe(url, client):
+    """
+    Check with a HEAD request whether a business page is worth loading.
+
+    Only clear misses count as dead: the page is gone (404/410) or
+    redirects away from a business (/d/) URL. Anything else, including
+    servers that refuse HEAD and probes that fail or time out, is left
+    for the browser to decide.
+
+    Args:
+        url: Business page URL
+        client: httpx.Client from get_http_client
+
+    Returns:
+        False if the page is dead, True otherwise
+    """
     try:
-        links = driver.find_elements(By.CSS_SELECTOR, "a[data-testid='contact-link']")
-        for link in links:
-            href = link.get_attribute("href")
-            if href and href.startswith("http"):
-                # Skip internal local.ch links and WhatsApp
-                if "local.ch" not in href and "wa.me" not in href and "whatsapp" not in href:
-                    website = href
-                    break
-    except:
-        pass
+        response = client.head(url, timeout=PROBE_TIMEOUT)
+    except httpx.HTTPError:
+        return True
+    if response.status_code in (404, 410):
+        return False
+    return "/d/" in str(response.url)
+
+
+def _node_text(node):
+    """Stripped text of a parsed node, or None if missing/empty."""
+    if node is None:
+        return None
+    return node.text(separator=" ", strip=True) or None
+
+
+def _is_dead_page(response):
+    """
+    Classify a business page response.
+
+    Returns True for a removed page (404, 410), False for success.
+    Raises httpx.HTTPStatusError for every other error status (403, 407,
+    408, 429, 5xx...), so it counts towards a proxy swap.
+    """
+    if response.status_code in _DEAD_STATUSES:
+        return True
+    response.raise_for_status()
+    return False
+
+
+def fetch_and_parse(url, client):
+    """
+    Extract ALL business data from a business page without a browser.
+
+    Same fields and filters as extract_all_data, but the page is fetched
+    over plain HTTP and parsed in-process. Only suitable for pages whose
+    data is present in the server-rendered HTML.
+
+    Args:
+        url: Business page URL
+        client: httpx.Client from get_http_client
+
+    Returns:
+        Dictionary with all business data, or None if the page is gone
+
+    Raises:
+        httpx.TransportError / httpx.HTTPStatusError on network failures
+    """
+    response = client.get(url)
+    if _is_dead_page(response):
+        return None
+    return parse_business_page(url, response.text)
+
+
+async def fetch_and_parse_async(url, client):
+    """
+    Async variant of fetch_and_parse.
+
+    Args:
+        url: Business page URL
+        client: httpx.AsyncClient from get_async_http_client
+
+    Returns:
+        Dictionary with all business data, or None if the page is gone
+    """
+    response = await client.get(url)
+    if _is_dead_page(response):
+        return None
+    return parse_business_page(url, response.text)
+
+
+def parse_business_page(url, html):
+    """
+    Extract ALL business data from a business page's HTML.
+
+    Args:
+        url: Business page URL
+        html: Page source
+
+    Returns:
+        Dictionary with all business data
+    """
+    tree = HTMLParser(html)
 
     return {
-        "name": name,
-        "type": business_type,
-        "address": address,
-        "phone": phone,
-        "email": email,
-        "website": website,
+        "name": _node_text(tree.css_first("h1")),
+        "type": _pick_type(_node_text(h2) for h2 in tree.css("h2")),
+        "address": _pick_address(_node_text(btn) for btn in tree.css("button")),
+        "phone": _node_text(tree.css_first("a[href^='tel:']")),
+        "email": _node_text(tree.css_first("a[href^='mailto:']")),
+        "website": _pick_website(
+            link.attributes.get("href") for link in tree.css("a[data-testid='contact-link']")
+        ),
         "source_url": url,
         "scraped_at": datetime.now().isoformat()
     }
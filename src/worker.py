@@ -2,41 +2,21 @@
 Parallel worker execution for local.ch scraper
 """
 
+import asyncio
 import time
-import threading
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import httpx
 from selenium.common.exceptions import WebDriverException, TimeoutException
 
-from scraper import get_driver, extract_all_data
-from db import save_business
-
-
-# Shared counters
-counters = {
-    "inserted": 0,
-    "skipped": 0,
-    "errors": 0,
-    "proxy_swaps": 0
-}
-counters_lock = threading.Lock()
-
-
-def reset_counters():
-    """Reset all counters."""
-    global counters
-    with counters_lock:
-        counters = {
-            "inserted": 0,
-            "skipped": 0,
-            "errors": 0,
-            "proxy_swaps": 0
-        }
-
-
-def get_counters():
-    """Get current counter values."""
-    with counters_lock:
-        return dict(counters)
+from config import PROXY_WAIT_TIMEOUT, DEFAULT_RENDERER, DEFAULT_DB_BATCH, DEFAULT_HTTP_CONCURRENCY
+from scraper import (
+    get_driver, quit_driver, set_driver_proxy, extract_all_data,
+    get_http_client, fetch_and_parse, get_async_http_client, fetch_and_parse_async,
+    quick_probe
+)
+from db import save_businesses, start_writer, stop_writer
+from log import logger, flush_log
 
 
 def divide_links(links, num_workers):
@@ -48,7 +28,7 @@ def divide_links(links, num_workers):
         num_workers: Number of workers
 
     Returns:
-        List of link chunks
+        List of index ranges into links, one per worker
     """
     chunk_size = len(links) // num_workers
     remainder = len(links) % num_workers
@@ -57,141 +37,379 @@ def divide_links(links, num_workers):
     start = 0
     for i in range(num_workers):
         end = start + chunk_size + (1 if i < remainder else 0)
-        chunks.append(links[start:end])
+        chunks.append(range(start, end))
         start = end
 
     return chunks
 
 
-def worker(worker_id, links, db_path, proxy_pool, config):
+# Failures that count towards a proxy swap
+NETWORK_ERRORS = (WebDriverException, TimeoutException, httpx.TransportError, httpx.HTTPStatusError)
+
+
+def open_session(renderer, proxy):
+    """
+    Start a page-fetching session for a renderer.
+
+    Returns:
+        Firefox WebDriver ("browser") or httpx.Client ("http")
+    """
+    if renderer == "http":
+        return get_http_client(proxy)
+    return get_driver(proxy)
+
+
+def close_session(session):
+    """Close a session from open_session."""
+    if isinstance(session, httpx.Client):
+        session.close()
+    else:
+        quit_driver(session)
+
+
+def swap_session_proxy(renderer, session, proxy, loaded):
+    """
+    Point a running browser at a new proxy in place.
+
+    Only a browser that completed a page load since it was started or
+    last switched is reused; one that only failed may be wedged and is
+    restarted instead of blaming proxy after proxy.
+
+    Args:
+        renderer: "browser" or "http"
+        session: Current session or None
+        proxy: New proxy string "host:port"
+        loaded: Whether the session completed a page load since its last swap
+
+    Returns:
+        True if the session was reused, False if it must be restarted
+    """
+    if renderer == "http" or session is None or not proxy or not loaded:
+        return False
+    try:
+        set_driver_proxy(session, proxy)
+        return True
+    except Exception:
+        return False
+
+
+def fetch_business(renderer, session, url):
+    """Extract business data from url with the renderer's session."""
+    if renderer == "http":
+        return fetch_and_parse(url, session)
+    return extract_all_data(session, url)
+
+
+def worker(worker_id, links, indices, db_path, proxy_pool, config):
     """
     Worker function with proxy hot-swap capability.
 
     Args:
         worker_id: Worker identifier
-        links: List of URLs to process
+        links: Shared list of all URLs
+        indices: Range of indices into links for this worker
         db_path: Path to SQLite database
         proxy_pool: ProxyPool instance or None
         config: Configuration dict
 
     Returns:
-        Tuple of (worker_id, inserted, skipped, errors)
+        Tuple of (worker_id, inserted, skipped, errors, swaps, dead)
     """
-    global counters
-
     local_inserted = 0
     local_skipped = 0
     local_errors = 0
     local_swaps = 0
+    local_dead = 0
 
-    driver = None
+    session = None
+    session_loaded = False  # session completed a page load since start/swap
+    probe_client = None  # HEAD probes ahead of browser page loads
     current_proxy = None
     consecutive_errors = 0
     i = 0
 
     max_errors = config.get("max_errors", 3)
     delay = config.get("delay", 0.3)
+    renderer = config.get("renderer", DEFAULT_RENDERER)
+    db_batch = config.get("db_batch", DEFAULT_DB_BATCH)
+
+    # Scraped businesses are saved db_batch at a time
+    pending = []
+
+    def flush():
+        """Save pending businesses in one call and update local counts."""
+        nonlocal local_inserted, local_skipped, local_errors
+        if not pending:
+            return
+        result = save_businesses(db_path, pending)
+        local_inserted += result["inserted"]
+        local_skipped += result["skipped"]
+        local_errors += result["failed"]
+        logger.info(f"[W{worker_id}] Saved {len(pending)}: {result['inserted']} inserted, "
+                    f"{result['skipped']} skipped, {result['failed']} failed")
+        pending.clear()
+
+    try:
+        while i < len(indices):
+            # Get or swap proxy if needed
+            if session is None or (proxy_pool and consecutive_errors >= max_errors):
+                flush()
+
+                # Mark current proxy as hot if we had errors
+                if proxy_pool and current_proxy and consecutive_errors >= max_errors:
+                    proxy_pool.mark_hot(current_proxy, worker_id)
+                    local_swaps += 1
 
-    while i < len(links):
-        # Get or swap proxy if needed
-        if driver is None or (proxy_pool and consecutive_errors >= max_errors):
-            # Close old driver if exists
-            if driver:
-                try:
-                    driver.quit()
-                except:
-                    pass
-                driver = None
-
-            # Mark current proxy as hot if we had errors
-            if proxy_pool and current_proxy and consecutive_errors >= max_errors:
-                proxy_pool.mark_hot(current_proxy, worker_id)
-                local_swaps += 1
-                with counters_lock:
-                    counters["proxy_swaps"] += 1
-
-            # Get new proxy (or None if no proxy mode)
-            if proxy_pool:
-                retry_count = 0
-                while retry_count < 10:
+                # Get new proxy (or None if no proxy mode)
+                if proxy_pool:
                     current_proxy = proxy_pool.get_proxy(worker_id)
-                    if current_proxy:
+                    if not current_proxy:
+                        logger.info(f"[W{worker_id}] Waiting for cold proxy...")
+                        current_proxy = proxy_pool.get_proxy_blocking(worker_id, PROXY_WAIT_TIMEOUT)
+
+                    if not current_proxy:
+                        logger.warning(f"[W{worker_id}] No proxies available, stopping")
                         break
-                    print(f"[W{worker_id}] Waiting for cold proxy...")
-                    time.sleep(30)
-                    retry_count += 1
+                else:
+                    current_proxy = None
+
+                # Probes go through the same proxy as the browser
+                if renderer == "browser":
+                    if probe_client:
+                        probe_client.close()
+                    probe_client = get_http_client(current_proxy)
+
+                # Keep a running browser and swap only its proxy
+                if swap_session_proxy(renderer, session, current_proxy, session_loaded):
+                    logger.info(f"[W{worker_id}] Switched to {current_proxy}")
+                    session_loaded = False
+                    consecutive_errors = 0
+                    continue
 
-                if not current_proxy:
-                    print(f"[W{worker_id}] No proxies available, stopping")
-                    break
-            else:
-                current_proxy = None
+                # Close old session if exists
+                if session:
+                    close_session(session)
+                    session = None
 
-            # Start new browser
+                # Start new browser / HTTP client
+                try:
+                    proxy_str = current_proxy if current_proxy else "direct"
+                    logger.info(f"[W{worker_id}] Starting with {proxy_str}")
+                    session = open_session(renderer, current_proxy)
+                    session_loaded = False
+                    consecutive_errors = 0
+                except Exception as e:
+                    logger.error(f"[W{worker_id}] Failed to start {renderer} session: {e}")
+                    if proxy_pool and current_proxy:
+                        proxy_pool.mark_hot(current_proxy, worker_id)
+                    current_proxy = None
+                    continue
+
+            # Process current link
+            url = links[indices[i]]
             try:
-                proxy_str = current_proxy if current_proxy else "direct"
-                print(f"[W{worker_id}] Starting with {proxy_str}")
-                driver = get_driver(current_proxy)
+                # Skip dead links before paying for a full browser load
+                if probe_client and not quick_probe(url, probe_client):
+                    local_dead += 1
+                    logger.info(f"[W{worker_id}] [{i+1}/{len(indices)}] Skipped dead link: {url}")
+                    i += 1
+                    continue
+
+                business = fetch_business(renderer, session, url)
+                session_loaded = True
+                if business is None:
+                    # Page is gone (404/410), not a proxy problem
+                    local_dead += 1
+                    logger.info(f"[W{worker_id}] [{i+1}/{len(indices)}] Dead link: {url}")
+                    consecutive_errors = 0
+                    i += 1
+                    continue
+
+                pending.append(business)
+                logger.info(f"[W{worker_id}] [{i+1}/{len(indices)}] Scraped: {business['name']}")
+                if len(pending) >= db_batch:
+                    flush()
+
                 consecutive_errors = 0
+                i += 1
+                time.sleep(delay)
+
+            except NETWORK_ERRORS as e:
+                consecutive_errors += 1
+                local_errors += 1
+                error_msg = str(e)[:80]
+                logger.warning(f"[W{worker_id}] [{i+1}/{len(indices)}] Network error ({consecutive_errors}/{max_errors}): {error_msg}")
+
+                if proxy_pool and consecutive_errors >= max_errors:
+                    logger.warning(f"[W{worker_id}] Too many errors, swapping proxy...")
+                elif not proxy_pool:
+                    # No proxy mode - just retry after delay
+                    time.sleep(2)
+                    if consecutive_errors >= max_errors:
+                        consecutive_errors = 0
+                        i += 1  # Skip this link after max retries
+
             except Exception as e:
-                print(f"[W{worker_id}] Failed to start browser: {e}")
-                if proxy_pool and current_proxy:
-                    proxy_pool.mark_hot(current_proxy, worker_id)
-                current_proxy = None
-                continue
+                local_errors += 1
+                logger.error(f"[W{worker_id}] [{i+1}/{len(indices)}] ERROR: {e}")
+                i += 1
+    finally:
+        # Cleanup (also when the loop is interrupted)
+        try:
+            flush()
+        finally:
+            if probe_client:
+                probe_client.close()
+            if session:
+                close_session(session)
+
+    logger.info(f"[Worker {worker_id}] DONE - Inserted: {local_inserted}, Skipped: {local_skipped}, Errors: {local_errors}, Swaps: {local_swaps}, Dead: {local_dead}")
+    return worker_id, local_inserted, local_skipped, local_errors, local_swaps, local_dead
 
-        # Process current link
-        url = links[i]
+
+async def worker_async(worker_id, links, indices, db_path, proxy_pool, config):
+    """
+    Concurrent worker for the "http" renderer.
+
+    Keeps up to config["concurrency"] requests in flight over one
+    httpx.AsyncClient. The proxy is swapped once max_errors network
+    errors happen with no success in between; unfinished links carry
+    over to the next proxy.
+
+    Args:
+        Same as worker
+
+    Returns:
+        Tuple of (worker_id, inserted, skipped, errors, swaps, dead)
+    """
+    local_inserted = 0
+    local_skipped = 0
+    local_errors = 0
+    local_swaps = 0
+    local_dead = 0
+
+    current_proxy = None
+    consecutive_errors = 0
+    done = 0
+
+    max_errors = config.get("max_errors", 3)
+    delay = config.get("delay", 0.3)
+    db_batch = config.get("db_batch", DEFAULT_DB_BATCH)
+    concurrency = config.get("concurrency", DEFAULT_HTTP_CONCURRENCY)
+
+    remaining = deque(indices)
+    attempts = {}
+    pending = []
+
+    async def flush():
+        """Save pending businesses in one call and update local counts."""
+        nonlocal local_inserted, local_skipped, local_errors
+        if not pending:
+            return
+        batch = pending[:]
+        pending.clear()
         try:
-            business = extract_all_data(driver, url)
-
-            if save_business(db_path, business):
-                local_inserted += 1
-                with counters_lock:
-                    counters["inserted"] += 1
-                print(f"[W{worker_id}] [{i+1}/{len(links)}] Inserted: {business['name']}")
-            else:
-                local_skipped += 1
-                with counters_lock:
-                    counters["skipped"] += 1
+            result = await asyncio.to_thread(save_businesses, db_path, batch)
+        except Exception as e:
+            local_errors += len(batch)
+            logger.error(f"[W{worker_id}] Failed to save {len(batch)} businesses: {e}")
+            return
+        local_inserted += result["inserted"]
+        local_skipped += result["skipped"]
+        local_errors += result["failed"]
+        logger.info(f"[W{worker_id}] Saved {len(batch)}: {result['inserted']} inserted, "
+                    f"{result['skipped']} skipped, {result['failed']} failed")
+
+    async def consume(client, swap):
+        """Fetch links from remaining until it is empty or a swap is due."""
+        nonlocal consecutive_errors, local_errors, local_dead, done
+        while remaining and not swap.is_set():
+            idx = remaining.popleft()
+            url = links[idx]
+            try:
+                business = await fetch_and_parse_async(url, client)
+            except NETWORK_ERRORS as e:
+                consecutive_errors += 1
+                local_errors += 1
+                error_msg = str(e)[:80]
+                logger.warning(f"[W{worker_id}] [{done}/{len(indices)}] Network error ({consecutive_errors}/{max_errors}): {error_msg}")
+
+                if proxy_pool:
+                    # Retry with the next proxy
+                    remaining.appendleft(idx)
+                    if consecutive_errors >= max_errors:
+                        swap.set()
+                else:
+                    # No proxy mode - retry later, skip after max retries
+                    attempts[idx] = attempts.get(idx, 0) + 1
+                    if attempts[idx] < max_errors:
+                        remaining.append(idx)
+                    else:
+                        done += 1
+                    await asyncio.sleep(2)
+                continue
+            except Exception as e:
+                local_errors += 1
+                done += 1
+                logger.error(f"[W{worker_id}] [{done}/{len(indices)}] ERROR: {e}")
+                continue
 
             consecutive_errors = 0
-            i += 1
-            time.sleep(delay)
-
-        except (WebDriverException, TimeoutException) as e:
-            consecutive_errors += 1
-            local_errors += 1
-            with counters_lock:
-                counters["errors"] += 1
-            error_msg = str(e)[:80]
-            print(f"[W{worker_id}] [{i+1}/{len(links)}] Network error ({consecutive_errors}/{max_errors}): {error_msg}")
-
-            if proxy_pool and consecutive_errors >= max_errors:
-                print(f"[W{worker_id}] Too many errors, swapping proxy...")
-            elif not proxy_pool:
-                # No proxy mode - just retry after delay
-                time.sleep(2)
-                if consecutive_errors >= max_errors:
-                    consecutive_errors = 0
-                    i += 1  # Skip this link after max retries
+            done += 1
+            if business is None:
+                # Page is gone (404/410), not a proxy problem
+                local_dead += 1
+                logger.info(f"[W{worker_id}] [{done}/{len(indices)}] Dead link: {url}")
+                continue
+
+            pending.append(business)
+            logger.info(f"[W{worker_id}] [{done}/{len(indices)}] Scraped: {business['name']}")
+            if len(pending) >= db_batch:
+                await flush()
+            await asyncio.sleep(delay)
+
+    try:
+        while remaining:
+            if proxy_pool:
+                # Mark current proxy as hot if we had errors
+                if current_proxy and consecutive_errors >= max_errors:
+                    logger.warning(f"[W{worker_id}] Too many errors, swapping proxy...")
+                    proxy_pool.mark_hot(current_proxy, worker_id)
+                    local_swaps += 1
+
+                current_proxy = proxy_pool.get_proxy(worker_id)
+                if not current_proxy:
+                    logger.info(f"[W{worker_id}] Waiting for cold proxy...")
+                    current_proxy = await asyncio.to_thread(
+                        proxy_pool.get_proxy_blocking, worker_id, PROXY_WAIT_TIMEOUT
+                    )
+
+                if not current_proxy:
+                    logger.warning(f"[W{worker_id}] No proxies available, stopping")
+                    break
+
+            consecutive_errors = 0
+            proxy_str = current_proxy if current_proxy else "direct"
+            logger.info(f"[W{worker_id}] Starting with {proxy_str} ({concurrency} concurrent)")
+
+            swap = asyncio.Event()
+            async with get_async_http_client(current_proxy, concurrency) as client:
+                await asyncio.gather(*(consume(client, swap) for _ in range(concurrency)))
+    finally:
+        # Save what was scraped even if the loop is interrupted
+        await flush()
+
+    logger.info(f"[Worker {worker_id}] DONE - Inserted: {local_inserted}, Skipped: {local_skipped}, Errors: {local_errors}, Swaps: {local_swaps}, Dead: {local_dead}")
+    return worker_id, local_inserted, local_skipped, local_errors, local_swaps, local_dead
 
-        except Exception as e:
-            local_errors += 1
-            with counters_lock:
-                counters["errors"] += 1
-            print(f"[W{worker_id}] [{i+1}/{len(links)}] ERROR: {e}")
-            i += 1
-
-    # Cleanup
-    if driver:
-        try:
-            driver.quit()
-        except:
-            pass
 
-    print(f"[Worker {worker_id}] DONE - Inserted: {local_inserted}, Skipped: {local_skipped}, Errors: {local_errors}, Swaps: {local_swaps}")
-    return worker_id, local_inserted, local_skipped, local_errors
+async def _gather_async_workers(links, link_chunks, db_path, proxy_pool, config):
+    """Run one worker_async per link chunk on a single event loop."""
+    return await asyncio.gather(
+        *(worker_async(i, links, chunk, db_path, proxy_pool, config)
+          for i, chunk in enumerate(link_chunks)),
+        return_exceptions=True
+    )
 
 
 def run_workers(links, db_path, proxy_pool, config):
@@ -208,34 +426,60 @@ def run_workers(links, db_path, proxy_pool, config):
         Dict with results
     """
     num_workers = config.get("workers", 1)
-    reset_counters()
+    renderer = config.get("renderer", DEFAULT_RENDERER)
+    concurrency = config.get("concurrency", DEFAULT_HTTP_CONCURRENCY)
+    results = {
+        "inserted": 0,
+        "skipped": 0,
+        "errors": 0,
+        "proxy_swaps": 0,
+        "dead": 0
+    }
 
     # Divide links among workers
     link_chunks = divide_links(links, num_workers)
 
-    print(f"\n[*] Dividing {len(links)} links among {num_workers} workers:")
+    logger.info(f"\n[*] Dividing {len(links)} links among {num_workers} workers:")
     for i, chunk in enumerate(link_chunks):
-        print(f"    Worker {i}: {len(chunk)} links")
+        logger.info(f"    Worker {i}: {len(chunk)} links")
 
-    print(f"\n[*] Starting {num_workers} workers...")
+    logger.info(f"\n[*] Starting {num_workers} workers...")
+    start_writer(db_path)
     start_time = time.time()
 
-    with ThreadPoolExecutor(max_workers=num_workers) as executor:
-        futures = []
-        for i in range(num_workers):
-            future = executor.submit(worker, i, link_chunks[i], db_path, proxy_pool, config)
-            futures.append(future)
-
-        # Wait for all workers to complete
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                print(f"[ERROR] Worker failed: {e}")
-
+    if renderer == "http" and concurrency > 1:
+        # HTTP workers share one event loop, each with requests in flight
+        outcomes = asyncio.run(_gather_async_workers(links, link_chunks, db_path, proxy_pool, config))
+    else:
+        outcomes = []
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            futures = []
+            for i in range(num_workers):
+                future = executor.submit(worker, i, links, link_chunks[i], db_path, proxy_pool, config)
+                futures.append(future)
+
+            # Wait for all workers to complete
+            for future in as_completed(futures):
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    outcomes.append(e)
+
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            logger.error(f"[ERROR] Worker failed: {outcome}")
+            continue
+        _, inserted, skipped, errors, swaps, dead = outcome
+        results["inserted"] += inserted
+        results["skipped"] += skipped
+        results["errors"] += errors
+        results["proxy_swaps"] += swaps
+        results["dead"] += dead
+
+    stop_writer()
     elapsed = time.time() - start_time
+    flush_log()
 
-    results = get_counters()
     results["elapsed"] = elapsed
     results["elapsed_min"] = elapsed / 60
 